@@ -1,6 +1,9 @@
 # ------------------------------------------------------------
 # app_poster_calligraphy.py
 # FastAPI + SQLite + Emotion-based Calligraphy Poster Generator
+# 실행: uvicorn app_calligraphy:app --host 0.0.0.0 --port 8000 --workers 4
+#   /render 는 전용 스레드풀에서 렌더링하고, --workers 로 프로세스 단위 병렬화를 더한다.
+#   (튜닝 스케줄러는 파일 락을 잡은 워커 하나에서만 돈다)
 # ------------------------------------------------------------
 
 
@@ -8,12 +11,16 @@ from fastapi import FastAPI, Form
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from apscheduler.schedulers.background import BackgroundScheduler
+import PIL
 from PIL import (
     Image, ImageDraw, ImageFont, ImageFilter,
-    ImageChops, ImageOps, ImageEnhance
+    ImageOps, ImageEnhance
 )
-import os, io, json, random, sqlite3, time, textwrap, datetime, requests
-import base64
+from functools import lru_cache
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import asyncio, os, re, json, sqlite3, threading, time, datetime, requests
 
 # ------------------------------------------------------------
 # 기본 설정
@@ -30,17 +37,59 @@ os.makedirs("outputs", exist_ok=True)
 
 EMO_LABELS = ["기쁨", "슬픔", "분노", "평온", "열정", "냉정"]
 
+# Pillow-SIMD 적용 여부 확인용 (버전에 .post 가 붙으면 SIMD 빌드)
+print("[PIL]", PIL.__version__)
+
+# ------------------------------------------------------------
+# 난수 (렌더 스레드마다 NumPy Generator 1개)
+# ------------------------------------------------------------
+_rng_local = threading.local()
+
+def _rng():
+    r = getattr(_rng_local, "rng", None)
+    if r is None:
+        r = _rng_local.rng = np.random.default_rng()
+    return r
+
+def _choice(seq):
+    return seq[_rng().integers(len(seq))]
+
 # ------------------------------------------------------------
 # FastAPI 초기화
 # ------------------------------------------------------------
 app = FastAPI(title="AI Calligraphy Poster")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+class ImmutableStaticFiles(StaticFiles):
+    # 결과 파일명은 생성마다 고유 → 브라우저가 재검증 없이 영구 캐시
+    def file_response(self, *args, **kwargs):
+        resp = super().file_response(*args, **kwargs)
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return resp
+
+app.mount("/outputs", ImmutableStaticFiles(directory="outputs"), name="outputs")
+
 # ------------------------------------------------------------
 # SQLite 초기화
 # ------------------------------------------------------------
+_db_local = threading.local()
+
 def db_conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    # 스레드마다 커넥션 1개를 재사용 (sqlite3 커넥션은 스레드 간 공유 불가)
+    con = getattr(_db_local, "con", None)
+    if con is None:
+        # 쓰기는 BEGIN IMMEDIATE로 시작해 잠금 승격 충돌(database is locked)을 피하고,
+        # 그래도 경합하면 busy_timeout 동안 대기한다
+        con = sqlite3.connect(DB_PATH, isolation_level="IMMEDIATE")
+        con.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA busy_timeout=5000;
+        PRAGMA cache_size=-64000;
+        PRAGMA temp_store=MEMORY;
+        """)
+        _db_local.con = con
+    return con
 
 def init_db():
     con = db_conn()
@@ -63,26 +112,32 @@ def init_db():
         FOREIGN KEY (generation_id) REFERENCES generations(id)
     )
     """)
-    con.commit(); con.close()
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_feedback_gid ON feedback(generation_id)")
+    con.commit()
 init_db()
 
 # ------------------------------------------------------------
 # 감정 분석 (간단 휴리스틱)
 # ------------------------------------------------------------
+KEYWORD_MAP = {
+    **dict.fromkeys(["행복", "기쁨", "빛", "웃음", "희망"], "기쁨"),
+    **dict.fromkeys(["슬픔", "눈물", "그리움", "쓸쓸", "비"], "슬픔"),
+    **dict.fromkeys(["분노", "타오르", "격렬", "불꽃"], "분노"),
+    **dict.fromkeys(["평온", "고요", "잔잔", "바람"], "평온"),
+    **dict.fromkeys(["열정", "붉", "뜨겁", "강렬"], "열정"),
+    **dict.fromkeys(["냉정", "차갑", "서늘", "무심"], "냉정"),
+}
+# 키워드 전체를 하나의 alternation으로 컴파일 → 문자열을 한 번만 스캔
+KEYWORD_RE = re.compile("|".join(re.escape(k) for k in sorted(KEYWORD_MAP, key=len, reverse=True)))
+
 def analyze_emotion(text: str):
-    emo = {k: 0.0 for k in EMO_LABELS}
-    pos = ["행복", "기쁨", "빛", "웃음", "희망"]
-    sad = ["슬픔", "눈물", "그리움", "쓸쓸", "비"]
-    anger = ["분노", "타오르", "격렬", "불꽃"]
-    calm = ["평온", "고요", "잔잔", "바람"]
-    passion = ["열정", "붉", "뜨겁", "강렬"]
-    cold = ["냉정", "차갑", "서늘", "무심"]
-    for w in pos:     emo["기쁨"] += text.count(w)
-    for w in sad:     emo["슬픔"] += text.count(w)
-    for w in anger:   emo["분노"] += text.count(w)
-    for w in calm:    emo["평온"] += text.count(w)
-    for w in passion: emo["열정"] += text.count(w)
-    for w in cold:    emo["냉정"] += text.count(w)
+    # 같은 문구 재제출이 잦아 공백 정규화한 텍스트로 캐시 (호출자가 수정해도 안전하게 사본 반환)
+    return dict(_analyze_emotion(" ".join(text.split())))
+
+@lru_cache(maxsize=4096)
+def _analyze_emotion(text: str):
+    emo = dict.fromkeys(EMO_LABELS, 0.0)
+    emo.update(Counter(KEYWORD_MAP[m] for m in KEYWORD_RE.findall(text)))
     if sum(emo.values()) == 0: emo["평온"] = 1.0
     s = sum(emo.values()); return {k: v/s for k,v in emo.items()}
 
@@ -92,15 +147,27 @@ def analyze_emotion(text: str):
 MODEL_DIR = "models"; os.makedirs(MODEL_DIR, exist_ok=True)
 TUNING_JSON = os.path.join(MODEL_DIR, "style_tuning.json")
 
+# 파일은 스케줄러가 10분마다 갱신하므로 mtime이 바뀔 때만 다시 읽는다
+_tuning_cache = {"mtime": 0, "data": None}
+
 def load_tuning():
-    if os.path.exists(TUNING_JSON):
-        return json.load(open(TUNING_JSON, encoding="utf-8"))
-    t = {emo: 1.0 for emo in EMO_LABELS}
-    json.dump(t, open(TUNING_JSON,"w",encoding="utf-8"), ensure_ascii=False, indent=2)
+    if not os.path.exists(TUNING_JSON):
+        t = {emo: 1.0 for emo in EMO_LABELS}
+        save_tuning(t)
+        return t
+    m = os.stat(TUNING_JSON).st_mtime_ns
+    if m == _tuning_cache["mtime"] and _tuning_cache["data"] is not None:
+        return _tuning_cache["data"]
+    t = json.load(open(TUNING_JSON, encoding="utf-8"))
+    _tuning_cache.update(mtime=m, data=t)
     return t
 
 def save_tuning(tuning: dict):
-    json.dump(tuning, open(TUNING_JSON,"w",encoding="utf-8"), ensure_ascii=False, indent=2)
+    # 임시 파일에 쓰고 교체 → 다른 워커의 load_tuning이 반쯤 쓰인 파일을 읽지 않게
+    tmp = f"{TUNING_JSON}.{os.getpid()}.tmp"
+    with open(tmp,"w",encoding="utf-8") as f: json.dump(tuning, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, TUNING_JSON)
+    _tuning_cache.update(mtime=os.stat(TUNING_JSON).st_mtime_ns, data=tuning)
 
 # ------------------------------------------------------------
 # 감정별 스타일 매핑
@@ -108,9 +175,13 @@ def save_tuning(tuning: dict):
 BASE_STYLE = {"ink_base":20,"blur":1.5}
 
 def emotion_to_style(emo_score: dict, tuning: dict):
-    style = dict(BASE_STYLE)
     emo = max(emo_score, key=emo_score.get)
-    weight = tuning.get(emo, 1.0)
+    return dict(_emotion_style(emo, tuning.get(emo, 1.0)))
+
+@lru_cache(maxsize=256)
+def _emotion_style(emo: str, weight: float):
+    # 스타일은 (대표 감정, 튜닝 가중치)만으로 결정되므로 그 쌍으로 캐시 (튜닝이 바뀌면 키도 바뀜)
+    style = dict(BASE_STYLE)
     # 감정별 시그니처
     if emo == "기쁨": style.update({"ink_base":10,"blur":1.0})
     elif emo == "슬픔": style.update({"ink_base":40,"blur":2.0})
@@ -124,78 +195,183 @@ def emotion_to_style(emo_score: dict, tuning: dict):
 # ------------------------------------------------------------
 # 랜덤 배경 이미지 선택
 # ------------------------------------------------------------
-def get_random_poster_bg(emotion: str):
+BG_LIST_TTL = 60  # 초
+BG_DIM_LUT = [(v*(255-120)+127)//255 for v in range(256)]*3
+_bg_files_cache = {}
+
+def list_poster_bgs(emotion: str):
+    # 감정별 배경 목록은 BG_LIST_TTL 동안 재사용 (요청마다 listdir 하지 않음)
+    hit = _bg_files_cache.get(emotion)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
     emo_dir = os.path.join(POSTER_DIR, emotion)
+    files = []
     if os.path.exists(emo_dir):
         files = [f for f in os.listdir(emo_dir) if f.lower().endswith((".jpg",".png"))]
-        if files:
-            img = Image.open(os.path.join(emo_dir, random.choice(files))).resize(POSTER_SIZE).convert("RGB")
-            overlay = Image.new("RGBA", POSTER_SIZE, (0,0,0,120))
-            img = img.convert("RGBA"); img.alpha_composite(overlay)
-            return img.convert("RGB")
+    _bg_files_cache[emotion] = (time.monotonic() + BG_LIST_TTL, files)
+    return files
+
+# emo_getter 기본값(6감정 × 5장 = 30장)을 모두 담는 크기 → 워밍업 후 적중률 100% (≈ 2.7MB/장, 최대 ~86MB)
+@lru_cache(maxsize=32)
+def _load_bg(path: str, mtime_ns: int):
+    # mtime_ns는 캐시 키 전용: emo_getter가 같은 파일명으로 다시 받으면 새 내용으로 다시 읽는다
+    # 디코드 + 리사이즈 + 어둡게 처리한 배경을 캐시. 호출 측은 읽기 전용으로만 사용해야 한다.
+    # 어두운 오버레이 + 한지/잉크 합성 뒤에는 bicubic과 차이가 보이지 않으므로 bilinear(4-tap) 사용
+    img = Image.open(path).resize(POSTER_SIZE, Image.BILINEAR).convert("RGB")
+    # 검정(alpha 120) 오버레이 합성 = 밝기 135/255 배 → RGBA 변환 없이 LUT 한 번으로 처리
+    return img.point(BG_DIM_LUT)
+
+def get_random_poster_bg(emotion: str):
+    files = list_poster_bgs(emotion)
+    if files:
+        path = os.path.join(POSTER_DIR, emotion, _choice(files))
+        try:
+            return _load_bg(path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:  # 목록 TTL 사이에 삭제된 파일
+            pass
     return Image.new("RGB", POSTER_SIZE, (10,10,15))
 
 # ------------------------------------------------------------
 # 폰트 헬퍼
 # ------------------------------------------------------------
+# 폰트 존재 여부는 시작 시 한 번만 확인 (렌더 중에 알게 되면 500으로 끝남)
+if not os.path.exists(FONT_PATH):
+    print("[font] 폰트 파일을 찾을 수 없습니다:", FONT_PATH)
+
+@lru_cache(maxsize=32)
 def get_font(size): return ImageFont.truetype(FONT_PATH, size=size)
 
+_char_width_cache = {}
+
+def measure_wrap(draw, text, font, max_px):
+    # 실제 글자 폭 기준 greedy 줄바꿈: 공백 단위로 채우고, 한 줄보다 긴 단어(한글 연속 등)는 글자 단위로 자른다.
+    # 글자 폭은 (폰트, 크기, 글자)별로 캐시하므로 두 번째 호출부터는 PIL 측정이 거의 없다.
+    def width(s):
+        w = 0
+        for ch in s:
+            key = (font.path, font.size, ch)
+            if key not in _char_width_cache:
+                _char_width_cache[key] = draw.textlength(ch, font=font)
+            w += _char_width_cache[key]
+        return w
+    space_w = width(" ")
+    lines, cur, cur_w = [], "", 0
+    for word in text.split():
+        ww = width(word)
+        if cur and cur_w + space_w + ww <= max_px:
+            cur += " " + word; cur_w += space_w + ww
+            continue
+        if cur: lines.append(cur)
+        cur, cur_w = "", 0
+        for ch in word:
+            cw = width(ch)
+            if cur and cur_w + cw > max_px:
+                lines.append(cur); cur, cur_w = "", 0
+            cur += ch; cur_w += cw
+    if cur: lines.append(cur)
+    return lines
+
 # ------------------------------------------------------------
-# 붓터치 + 한지 질감 렌더링
+# 정적 에셋 캐시 (한지/낙관은 요청마다 동일하므로 시작 시 1회만 준비)
 # ------------------------------------------------------------
-def render_poster(text: str, emotion: str, style: dict):
-    bg = get_random_poster_bg(emotion).convert("RGB")
-
-    # 한지 질감
-    hanji_path = os.path.join(STATIC_DIR, "hanji_texture.jpg")
-    if os.path.exists(hanji_path):
-        hanji = Image.open(hanji_path).convert("L").resize(POSTER_SIZE)
-        hanji = ImageOps.autocontrast(hanji)
-        bg = ImageChops.multiply(bg, Image.merge("RGB",(hanji,hanji,hanji)))
-    else:
-        noise = Image.effect_noise(POSTER_SIZE, 20).convert("L")
-        noise_rgb = Image.merge("RGB",(noise,noise,noise))
-        bg = ImageChops.multiply(bg, noise_rgb)
-
-    canvas = bg.convert("RGBA")
-    draw = ImageDraw.Draw(canvas)
-    font = get_font(int(POSTER_SIZE[0]*0.25))
-    lines = textwrap.wrap(text, width=5)
-    total_h = sum(draw.textbbox((0,0),l,font=font)[3] for l in lines)+80*(len(lines)-1)
-    y=(POSTER_SIZE[1]-total_h)//2
-
-    # 마스크 생성
+HANJI_PATH = os.path.join(STATIC_DIR, "hanji_texture.jpg")
+
+def _load_hanji():
+    # 단일 채널(L) 그대로 보관하고 합성 시 RGB로 브로드캐스트 (RGB 복제본 불필요)
+    if not os.path.exists(HANJI_PATH): return None
+    hanji = Image.open(HANJI_PATH).convert("L").resize(POSTER_SIZE)
+    return np.asarray(ImageOps.autocontrast(hanji))
+
+def _load_seal(size):
+    # 낙관은 작고 위치가 고정이라 NumPy 슬라이스 블렌딩용 (RGB, alpha) 배열로 보관
+    if not os.path.exists(SEAL_PATH): return None, None
+    seal = np.asarray(Image.open(SEAL_PATH).convert("RGBA").resize(size), dtype=np.float32)
+    return seal[..., :3], seal[..., 3:4]/255.0
+
+HANJI_L = _load_hanji()
+SEAL_RGB, SEAL_A = _load_seal((90,90))
+SEAL_POS = (POSTER_SIZE[0]-120, POSTER_SIZE[1]-130)
+
+# 노이즈는 질감용(지각적)이라 요청마다 새로 만들 필요가 없다 → 시작 시 타일 풀을 만들고 골라 쓴다
+NOISE_POOL_SIZE = 8
+BRUSH_POOL = [np.asarray(ImageEnhance.Contrast(Image.effect_noise(POSTER_SIZE,25)).enhance(2.5))
+              for _ in range(NOISE_POOL_SIZE)]
+PAPER_NOISE_POOL = [] if HANJI_L is not None else [
+    np.asarray(Image.effect_noise(POSTER_SIZE,20)) for _ in range(NOISE_POOL_SIZE)]
+
+@lru_cache(maxsize=32)
+def _build_masks(text: str, font_size: int, blur_bucket: int):
+    # 같은 (문장, 폰트 크기, 블러 버킷)이면 마스크는 결정적이므로 캐시 → 재요청 시 text/blur/brightness 생략.
+    # blur_bucket = round(blur_radius*4): 거의 같은 float 반경을 하나로 묶는다. (1항목 ≈ 1.8MB)
+    font = get_font(font_size)
     text_mask = Image.new("L", POSTER_SIZE, 0)
     mask_draw = ImageDraw.Draw(text_mask)
-    for line in lines:
-        w,h = mask_draw.textbbox((0,0),line,font=font)[2:]
+    lines = measure_wrap(mask_draw, text, font, POSTER_SIZE[0]-80)
+    # 줄별 (w,h)는 한 번만 측정해 높이 합산과 배치에 같이 사용
+    sizes = [mask_draw.textbbox((0,0),l,font=font)[2:] for l in lines]
+    total_h = sum(h for _,h in sizes)+80*(len(lines)-1)
+    y=(POSTER_SIZE[1]-total_h)//2
+    for line,(w,h) in zip(lines,sizes):
         x=(POSTER_SIZE[0]-w)//2
         mask_draw.text((x,y),line,fill=255,font=font)
         y+=h+80
 
-    blur_radius=float(style.get("blur",1.0))
-    bleed_mask=text_mask.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-    bleed_mask=ImageEnhance.Brightness(bleed_mask).enhance(1.1)
+    blur_radius=blur_bucket/4
+    bleed_mask=Image.new("L",POSTER_SIZE,0)
+    bbox=text_mask.getbbox()
+    if bbox:
+        # 글자가 있는 영역(+블러 반경 여유)만 잘라서 처리 — 빈 여백은 블러해도 0이다
+        pad=int(blur_radius*3)+4
+        # 원점/크기를 짝수로 맞춰야 1/2 축소→복원이 전체 프레임과 같은 2× 격자에 놓인다 (서브픽셀 어긋남 방지)
+        x0=max(0,bbox[0]-pad)&~1; y0=max(0,bbox[1]-pad)&~1
+        x1=min(POSTER_SIZE[0],(bbox[2]+pad+1)&~1); y1=min(POSTER_SIZE[1],(bbox[3]+pad+1)&~1)
+        box=(x0,y0,x1,y1)
+        region=text_mask.crop(box)
+        # 1/2 해상도에서 블러 후 업샘플 (번짐 효과라 화질 차이는 거의 없음).
+        # PIL GaussianBlur는 이미 분리형(separable)이라 이득은 픽셀 수 1/4 감소에서만 나온다.
+        half=(max(1,region.width//2),max(1,region.height//2))
+        small=region.resize(half,Image.BILINEAR)
+        small=small.filter(ImageFilter.GaussianBlur(radius=blur_radius/2))
+        region=small.resize(region.size,Image.BILINEAR)
+        bleed_mask.paste(ImageEnhance.Brightness(region).enhance(1.1),box[:2])
+    return text_mask.tobytes(), bleed_mask.tobytes()
 
-    brush_noise=Image.effect_noise(POSTER_SIZE,25).convert("L")
-    brush_texture=ImageEnhance.Contrast(brush_noise).enhance(2.5)
+# ------------------------------------------------------------
+# 붓터치 + 한지 질감 렌더링
+# ------------------------------------------------------------
+def render_poster(text: str, emotion: str, style: dict):
+    bg = get_random_poster_bg(emotion)
 
-    ink_intensity=max(0,60-int(style["ink_base"]*5))
-    ink_color=(ink_intensity,ink_intensity,ink_intensity)
-    text_layer=Image.new("RGBA",POSTER_SIZE,(0,0,0,0))
-    ImageDraw.Draw(text_layer).bitmap((0,0),text_mask,fill=ink_color)
+    # 한지 질감 (L 채널, 아래 합성 커널에서 RGB로 브로드캐스트해 곱함)
+    if HANJI_L is not None:
+        paper = HANJI_L
+    else:
+        paper = _choice(PAPER_NOISE_POOL)
 
-    merged=ImageChops.add(text_layer,Image.merge("RGBA",(bleed_mask,)*4))
-    merged=ImageChops.multiply(merged,Image.merge("RGBA",(brush_texture,)*4))
-    canvas.alpha_composite(merged)
+    mask_bytes, bleed_bytes = _build_masks(text, int(POSTER_SIZE[0]*0.25), round(float(style.get("blur",1.0))*4))
 
-    if os.path.exists(SEAL_PATH):
-        seal=Image.open(SEAL_PATH).convert("RGBA").resize((90,90))
-        canvas.alpha_composite(seal,(POSTER_SIZE[0]-120,POSTER_SIZE[1]-130))
+    ink_intensity=max(0,60-int(style["ink_base"]*5))
 
+    # 잉크 레이어 합성 (add → multiply → alpha_composite)과 한지 곱셈을 NumPy 한 번의 패스로 융합.
+    # 잉크·한지가 모두 무채색이라 RGBA 4채널 대신 단일 채널 평면만 계산하고 RGB로 브로드캐스트한다.
+    mask=np.frombuffer(mask_bytes,np.uint8).reshape(POSTER_SIZE[1],POSTER_SIZE[0]).astype(np.float32)
+    bleed=np.frombuffer(bleed_bytes,np.uint8).reshape(POSTER_SIZE[1],POSTER_SIZE[0]).astype(np.float32)
+    brush=_choice(BRUSH_POOL)/np.float32(255.0)
+    ink=np.minimum((mask>0)*np.float32(ink_intensity)+bleed,255)*brush  # float32 유지 (np.where에 int를 넘기면 float64로 승격)
+    alpha=np.minimum(mask+bleed,255)*brush/255.0
+    paper=paper*(1-alpha)/255.0
+    out=np.asarray(bg,dtype=np.float32)*paper[...,None]+(ink*alpha)[...,None]
+
+    if SEAL_RGB is not None:
+        x,y=SEAL_POS; h,w=SEAL_RGB.shape[:2]
+        region=out[y:y+h,x:x+w]
+        region*=1-SEAL_A; region+=SEAL_RGB*SEAL_A
+    canvas=Image.fromarray(out.astype(np.uint8),"RGB")
+
+    # 대비는 최종 이미지의 전체 평균 휘도가 필요해 같은 패스에 넣을 수 없으므로 PIL(C)로 처리
     canvas=ImageEnhance.Contrast(canvas).enhance(1.5)
     canvas=ImageEnhance.Sharpness(canvas).enhance(2.0)
-    return canvas.convert("RGB")
+    return canvas
 
 # ------------------------------------------------------------
 # DB 저장 및 피드백
@@ -204,43 +380,62 @@ def save_generation(text, emo, filename):
     con=db_conn();cur=con.cursor()
     cur.execute("INSERT INTO generations(text, emo, filename, created_at) VALUES (?,?,?,?)",
         (text, emo, filename, datetime.datetime.utcnow().isoformat()))
-    gid=cur.lastrowid;con.commit();con.close();return gid
+    gid=cur.lastrowid;con.commit();return gid
 
 def save_feedback(gid, satisfied):
     con=db_conn();cur=con.cursor()
     cur.execute("INSERT INTO feedback(generation_id,satisfied,created_at) VALUES (?,?,?)",
         (gid,int(satisfied),datetime.datetime.utcnow().isoformat()))
-    con.commit();con.close()
+    con.commit()
 
 # ------------------------------------------------------------
 # 튜닝 주기적 업데이트
 # ------------------------------------------------------------
 def training_job():
     con=db_conn();cur=con.cursor()
-    cur.execute("SELECT emo, satisfied FROM feedback f JOIN generations g ON f.generation_id=g.id")
-    rows=cur.fetchall();con.close()
+    # 감정별 집계는 SQLite에서 수행 (감정당 1행만 전송)
+    cur.execute("SELECT g.emo, COUNT(*), SUM(f.satisfied) FROM feedback f JOIN generations g ON f.generation_id=g.id GROUP BY g.emo")
+    rows=cur.fetchall()
     if not rows:return
-    tuning=load_tuning();counts={emo:[0,0] for emo in EMO_LABELS}
-    for emo,sat in rows:
-        if emo in counts:
-            counts[emo][0]+=1;counts[emo][1]+=int(sat)
-    for emo,(n,s) in counts.items():
-        if n>0:
-            rate=s/n
+    tuning=dict(load_tuning())
+    for emo,n,s in rows:
+        if emo in EMO_LABELS:
+            rate=(s or 0)/n
             target=0.7+0.6*rate
             tuning[emo]=0.7*tuning.get(emo,1.0)+0.3*target
     save_tuning(tuning)
     print("[trainer] updated:",tuning)
 
+# 렌더링 전용 스레드풀: PIL 커널(blur/resize/chops/PNG 인코딩)은 GIL을 해제하므로
+# 스레드만으로도 여러 코어에서 병렬로 돈다. 프로세스풀은 워커마다 이 모듈을
+# 다시 import 해 init_db/스케줄러가 중복 실행되므로 사용하지 않는다.
+render_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="render")
+
+def _acquire_scheduler_lock():
+    # --workers N 이면 워커마다 이 모듈을 import 하므로, 락을 잡은 프로세스 하나만 스케줄러를 돌린다
+    # (여러 번 돌면 0.7/0.3 갱신이 N배 빨라지고 read-modify-write가 서로 덮어쓴다)
+    global _scheduler_lock
+    try:
+        import fcntl
+    except ImportError:  # Windows: 단일 프로세스 실행으로 간주
+        return True
+    _scheduler_lock = open(os.path.join(MODEL_DIR, ".scheduler.lock"), "w")
+    try:
+        fcntl.flock(_scheduler_lock, fcntl.LOCK_EX | fcntl.LOCK_NB); return True
+    except OSError:
+        _scheduler_lock.close(); return False
+
 scheduler=BackgroundScheduler()
 scheduler.add_job(training_job,"interval",minutes=10)
-scheduler.start()
+if _acquire_scheduler_lock():
+    scheduler.start()
+else:
+    print("[scheduler] 다른 워커가 실행 중 → 이 프로세스에서는 생략")
 
 # ------------------------------------------------------------
-# 공통 Navbar
+# 공통 Navbar / HTML 템플릿 (모듈 로드 시 1회만 구성)
 # ------------------------------------------------------------
-def navbar():
-    return """
+NAVBAR = """
     <nav class="navbar navbar-expand-lg navbar-dark bg-dark sticky-top">
       <div class="container-fluid">
         <a class="navbar-brand fw-bold" href="/">🖋️ AI Calligraphy</a>
@@ -258,17 +453,13 @@ def navbar():
     </nav>
     """
 
-# ------------------------------------------------------------
-# Routes
-# ------------------------------------------------------------
-@app.get("/", response_class=HTMLResponse)
-def index():
-    return f"""
+# 동적인 부분이 없으므로 UTF-8 인코딩까지 미리 끝내 둔다
+INDEX_HTML = f"""
     <html><head><meta charset='utf-8'>
     <meta name='viewport' content='width=device-width,initial-scale=1'>
     <link href='https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css' rel='stylesheet'>
     <script src='https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js'></script>
-    </head><body class='bg-light'>{navbar()}
+    </head><body class='bg-light'>{NAVBAR}
       <div class='container py-5'>
         <h2 class='text-center mb-4'>감성 캘리그래피 포스터 생성</h2>
         <form method='post' action='/render' class='card p-4 shadow-sm'>
@@ -278,30 +469,14 @@ def index():
           <button type='submit' class='btn btn-dark w-100'>이미지 생성</button>
         </form>
       </div></body></html>
-    """
-
-@app.post("/render", response_class=HTMLResponse)
-def render_endpoint(text: str = Form(...)):
-    emo_score = analyze_emotion(text)
-    dominant = max(emo_score, key=emo_score.get)
-    tuning = load_tuning()
-    style = emotion_to_style(emo_score, tuning)
-    img = render_poster(text, dominant, style)
-
-    fname = f"{time.strftime('%Y%m%d_%H%M%S')}.png"
-    path = os.path.join("outputs", fname)
-    img.save(path)
-    gid = save_generation(text, dominant, fname)
-    buf = io.BytesIO(); img.save(buf, format="PNG")
-    b64 = base64.b64encode(buf.getvalue()).decode()
+    """.encode("utf-8")
 
-    rows = "".join([f"<tr><td>{k}</td><td>{emo_score[k]:.2f}</td><td>{tuning[k]:.2f}</td></tr>" for k in EMO_LABELS])
-    return f"""
+RENDER_HTML = """
     <html><head><meta charset='utf-8'>
     <link href='https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css' rel='stylesheet'>
-    </head><body class='bg-light'>{navbar()}
+    </head><body class='bg-light'>{navbar}
     <div class='container py-4'>
-      <img class='img-fluid border rounded mb-3' src='data:image/png;base64,{b64}'/>
+      <img class='img-fluid border rounded mb-3' src='/outputs/{fname}'/>
       <div class='d-flex gap-2'>
         <form method='post' action='/feedback'><input type='hidden' name='generation_id' value='{gid}'/>
         <input type='hidden' name='satisfied' value='1'/><button class='btn btn-success w-100'>😊 만족</button></form>
@@ -313,6 +488,50 @@ def render_endpoint(text: str = Form(...)):
       </div></div></body></html>
     """
 
+ADMIN_HTML = """
+    <html><head><meta charset='utf-8'>
+    <link href='https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css' rel='stylesheet'>
+    </head><body class='bg-dark text-light'>{navbar}
+    <div class='container py-5'>
+      <h4>피드백 통계</h4>
+      <p>총 {n}건, 만족률 {rate:.1%}</p>
+      <table class='table table-dark table-striped table-sm'>
+        <thead><tr><th>ID</th><th>감정</th><th>텍스트</th><th>파일</th><th>시각</th><th>최근피드백</th></tr></thead>
+        <tbody>{trs}</tbody>
+      </table>
+      <a href='/' class='btn btn-secondary'>← 생성 페이지</a>
+    </div></body></html>
+    """
+
+# ------------------------------------------------------------
+# Routes
+# ------------------------------------------------------------
+@app.get("/", response_class=HTMLResponse)
+def index():
+    return HTMLResponse(content=INDEX_HTML)
+
+def _render_job(text, dominant, style):
+    # 렌더링 + 저장을 한 번에 워커 스레드에서 수행
+    img = render_poster(text, dominant, style)
+    fname = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.urandom(3).hex()}.png"  # 같은 초 동시 생성도 덮어쓰지 않게
+    path = os.path.join("outputs", fname)
+    # 동적 생성물이므로 zlib 압축은 최소로 (level 6 대비 ~3배 빠름, 파일은 ~10% 큼)
+    img.save(path, format="PNG", optimize=False, compress_level=1)
+    gid = save_generation(text, dominant, fname)
+    return gid, fname
+
+@app.post("/render", response_class=HTMLResponse)
+async def render_endpoint(text: str = Form(...)):
+    emo_score = analyze_emotion(text)
+    dominant = max(emo_score, key=emo_score.get)
+    tuning = load_tuning()
+    style = emotion_to_style(emo_score, tuning)
+    gid, fname = await asyncio.get_running_loop().run_in_executor(
+        render_executor, _render_job, text, dominant, style)
+
+    rows = "".join([f"<tr><td>{k}</td><td>{emo_score[k]:.2f}</td><td>{tuning[k]:.2f}</td></tr>" for k in EMO_LABELS])
+    return HTMLResponse(content=RENDER_HTML.format(navbar=NAVBAR, fname=fname, gid=gid, rows=rows))
+
 @app.post("/feedback")
 def feedback_endpoint(generation_id: int = Form(...), satisfied: int = Form(...)):
     save_feedback(generation_id, satisfied)
@@ -324,19 +543,6 @@ def admin():
     cur.execute("SELECT COUNT(*),SUM(satisfied) FROM feedback");n,s=cur.fetchone()
     rate=(s or 0)/(n or 1)
     cur.execute("SELECT g.id,g.text,g.emo,g.filename,g.created_at,(SELECT satisfied FROM feedback f WHERE f.generation_id=g.id ORDER BY id DESC LIMIT 1) FROM generations g ORDER BY g.id DESC LIMIT 30")
-    rows=cur.fetchall();con.close()
+    rows=cur.fetchall()
     trs="".join([f"<tr><td>{i}</td><td>{emo}</td><td>{t}</td><td>{f}</td><td>{ts}</td><td>{'✅' if fb==1 else ('❌' if fb==0 else '—')}</td></tr>" for i,t,emo,f,ts,fb in rows])
-    return f"""
-    <html><head><meta charset='utf-8'>
-    <link href='https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css' rel='stylesheet'>
-    </head><body class='bg-dark text-light'>{navbar()}
-    <div class='container py-5'>
-      <h4>피드백 통계</h4>
-      <p>총 {n or 0}건, 만족률 {rate:.1%}</p>
-      <table class='table table-dark table-striped table-sm'>
-        <thead><tr><th>ID</th><th>감정</th><th>텍스트</th><th>파일</th><th>시각</th><th>최근피드백</th></tr></thead>
-        <tbody>{trs}</tbody>
-      </table>
-      <a href='/' class='btn btn-secondary'>← 생성 페이지</a>
-    </div></body></html>
-    """
+    return HTMLResponse(content=ADMIN_HTML.format(navbar=NAVBAR, n=n or 0, rate=rate, trs=trs))
@@ -11,12 +11,24 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from torchvision import models, transforms
 from PIL import Image
-import torch, json, io, os, base64
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from hashlib import blake2b
+import asyncio, torch, json, io, os, base64
 
 # --------------------------------------------------------
 # 초기 설정
 # --------------------------------------------------------
-app = FastAPI(title="🐱 Cat Classifier Web App")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 마이크로 배칭 큐/워커는 서버 이벤트 루프 위에서 만들어 앱 수명 동안 유지
+    global batch_queue
+    batch_queue = asyncio.Queue()
+    task = asyncio.create_task(batch_worker())
+    yield
+    task.cancel()
+
+app = FastAPI(title="🐱 Cat Classifier Web App", lifespan=lifespan)
 templates = Jinja2Templates(directory="templates")
 
 # static 폴더 (Bootstrap, CSS, JS용)
@@ -24,6 +36,13 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 MODEL_PATH = "models/cats_resnet18.pt"
 CLASS_MAP_PATH = "models/class_to_idx.json"
+INT8_PATH = "models/cats_resnet18_int8.pt"  # train_cats.py --int8 로 생성
+# 요청별 추론이 동시에 돌 때 BLAS 스레드 폭주 방지 (intra-op는 코어 절반, inter-op는 1)
+torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+try:
+    torch.set_num_interop_threads(1)
+except RuntimeError:  # 같은 프로세스에서 이미 병렬 작업이 시작된 경우 (설정은 한 번만 가능)
+    pass
 
 # --------------------------------------------------------
 # 모델 및 매핑 로드
@@ -32,31 +51,97 @@ with open(CLASS_MAP_PATH, "r", encoding="utf-8") as f:
     class_to_idx = json.load(f)
 idx_to_class = {v: k for k, v in class_to_idx.items()}
 
-model = models.resnet18(weights=None)
-model.fc = torch.nn.Linear(model.fc.in_features, len(idx_to_class))
-model.load_state_dict(torch.load(MODEL_PATH, map_location="cpu"))
-model.eval()
+# INT8 양자화 모델이 FP32 체크포인트보다 새것이면 우선 사용 (CAT_FP32=1 이면 FP32 모델로 강제)
+use_int8 = (os.environ.get("CAT_FP32") != "1" and os.path.exists(INT8_PATH)
+            and os.path.getmtime(INT8_PATH) >= os.path.getmtime(MODEL_PATH))
+if use_int8:
+    model = torch.jit.load(INT8_PATH, map_location="cpu")
+    model.eval()
+    print("[Model] INT8", INT8_PATH)
+else:
+    model = models.resnet18(weights=None)
+    model.fc = torch.nn.Linear(model.fc.in_features, len(idx_to_class))
+    model.load_state_dict(torch.load(MODEL_PATH, map_location="cpu"))
+    model.eval()
+    # 시작 시 TorchScript로 한 번 trace → 요청마다 Python 모듈 호출 오버헤드 제거
+    with torch.no_grad():
+        model = torch.jit.trace(model, torch.zeros(1, 3, 224, 224))
+
+# 동시에 도는 전처리(디코드/리사이즈) 수를 CPU 코어 수로 제한 (과도한 스레드 경쟁 방지)
+INFER_SEM = asyncio.Semaphore(os.cpu_count() or 4)
 
 # --------------------------------------------------------
 # 이미지 전처리 함수
 # --------------------------------------------------------
+RESIZE_TO = int(224 * 1.15)
 preprocess = transforms.Compose([
-    transforms.Resize(int(224 * 1.15)),
+    transforms.Resize(RESIZE_TO),
     transforms.CenterCrop(224),
     transforms.ToTensor(),
     transforms.Normalize(mean=[0.485, 0.456, 0.406],
                          std=[0.229, 0.224, 0.225]),
 ])
 
-def predict_image(image_bytes: bytes):
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    img_t = preprocess(img).unsqueeze(0)
-    with torch.no_grad():
-        logits = model(img_t)
+def load_tensor(image_bytes: bytes):
+    img = Image.open(io.BytesIO(image_bytes))
+    # JPEG는 libjpeg의 DCT 스케일링으로 Resize 목표(257px) 이상인 최소 크기로 바로 디코드
+    img.draft("RGB", (RESIZE_TO, RESIZE_TO))
+    img = img.convert("RGB")
+    return preprocess(img)
+
+def predict_batch(batch: torch.Tensor):
+    with torch.inference_mode():
+        logits = model(batch)
         probs = torch.nn.functional.softmax(logits, dim=1)
         conf, pred_idx = torch.max(probs, dim=1)
-        label = idx_to_class[pred_idx.item()]
-        return label, float(conf.item())
+    return [(idx_to_class[i], c) for c, i in zip(conf.tolist(), pred_idx.tolist())]
+
+# --------------------------------------------------------
+# 마이크로 배칭: BATCH_WAIT 안에 들어온 요청을 모아 한 번의 forward로 처리
+# (배치 1로 여러 번 도는 것보다 가중치 로드/BLAS 호출이 배치 크기만큼 분산된다)
+# --------------------------------------------------------
+BATCH_MAX = 16
+BATCH_WAIT = 0.01  # 초
+batch_queue: asyncio.Queue = None  # lifespan에서 생성
+# 배치 입력 버퍼는 한 번만 할당해 재사용 (batch_worker가 하나뿐이라 동시 사용 없음)
+_batch_buf = torch.empty((BATCH_MAX, 3, 224, 224), dtype=torch.float32)
+
+async def batch_worker():
+    while True:
+        items = [await batch_queue.get()]
+        await asyncio.sleep(BATCH_WAIT)
+        while len(items) < BATCH_MAX and not batch_queue.empty():
+            items.append(batch_queue.get_nowait())
+        futs = [fut for _, fut in items]
+        try:
+            batch = torch.stack([t for t, _ in items], out=_batch_buf[:len(items)])
+            results = await asyncio.to_thread(predict_batch, batch)
+        except Exception as e:
+            for fut in futs:
+                if not fut.done(): fut.set_exception(e)
+            continue
+        for fut, res in zip(futs, results):
+            if not fut.done(): fut.set_result(res)
+
+# 같은 이미지 재업로드(재시도/데모)는 해시 조회만으로 응답 (내용 기반 LRU 캐시).
+# predict_image는 이벤트 루프에서만 호출되므로 락이 필요 없다.
+CACHE_MAX = 1024
+_pred_cache = OrderedDict()
+
+async def predict_image(image_bytes: bytes):
+    key = blake2b(image_bytes, digest_size=16).digest()
+    if key in _pred_cache:
+        _pred_cache.move_to_end(key)
+        return _pred_cache[key]
+    async with INFER_SEM:
+        img_t = await asyncio.to_thread(load_tensor, image_bytes)
+    fut = asyncio.get_running_loop().create_future()
+    await batch_queue.put((img_t, fut))
+    result = await fut
+    _pred_cache[key] = result
+    if len(_pred_cache) > CACHE_MAX:
+        _pred_cache.popitem(last=False)
+    return result
 
 # --------------------------------------------------------
 # 메인 페이지
@@ -72,7 +157,8 @@ async def home(request: Request):
 async def predict(request: Request, file: UploadFile = File(...)):
     try:
         image_bytes = await file.read()
-        label, confidence = predict_image(image_bytes)
+        # 전처리/추론은 이벤트 루프 밖(스레드)에서 실행
+        label, confidence = await predict_image(image_bytes)
         img_b64 = base64.b64encode(image_bytes).decode("utf-8")
         img_src = f"data:image/jpeg;base64,{img_b64}"
         return templates.TemplateResponse("index.html", {
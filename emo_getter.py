@@ -3,9 +3,9 @@
 # API Key 없이 무료로 감정별 배경 이미지 크롤링
 # - Picsum Photos (https://picsum.photos)
 # ------------------------------------------------------------
-import os, random, requests
-from io import BytesIO
-from PIL import Image
+import os, random, shutil, requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 POSTER_DIR = "static/poster_bg"
 os.makedirs(POSTER_DIR, exist_ok=True)
@@ -20,10 +20,36 @@ EMO_BG_KEYWORDS = {
     "냉정": ["snow", "ice", "night", "minimal"]
 }
 
+# 다운로드는 네트워크 대기 시간이 대부분 → 스레드풀로 병렬 처리 + 세션 keep-alive 재사용
+MAX_WORKERS = 16
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+
+def _fetch_one(job):
+    emo, kw, url, save_path = job
+    tmp_path = save_path + ".part"
+    try:
+        # 서버가 이미 JPEG로 주므로 디코드/재인코딩 없이 그대로 디스크에 스트리밍
+        with SESSION.get(url, timeout=10, stream=True) as res:
+            res.raise_for_status()
+            ctype = res.headers.get("Content-Type", "")
+            if not ctype.startswith("image/"):
+                raise ValueError(f"이미지가 아닌 응답: {ctype or '(없음)'}")
+            res.raw.decode_content = True
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(res.raw, f, 65536)
+        # 끝까지 받은 경우에만 최종 경로로 교체 → 잘린 파일이 배경 목록에 섞이지 않음
+        os.replace(tmp_path, save_path)
+        print(f"  ✅ {save_path}")
+    except Exception as e:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        print(f"  ❌ {emo} {kw}: {e}")
+
 def download_emotion_backgrounds(per_emotion=5):
     """
     각 감정별 폴더에 랜덤 이미지 저장 (1080x1920, 세로형)
     """
+    jobs = []
     for emo, keywords in EMO_BG_KEYWORDS.items():
         emo_dir = os.path.join(POSTER_DIR, emo)
         os.makedirs(emo_dir, exist_ok=True)
@@ -35,15 +61,10 @@ def download_emotion_backgrounds(per_emotion=5):
             seed = random.randint(1, 99999)
             # Picsum 랜덤 이미지 (1080x1920)
             url = f"https://picsum.photos/seed/{kw}-{seed}/1080/1920"
-            try:
-                res = requests.get(url, timeout=10)
-                if res.status_code == 200:
-                    img = Image.open(BytesIO(res.content))
-                    save_path = os.path.join(emo_dir, f"{emo}_{i+1}.jpg")
-                    img.save(save_path)
-                    print(f"  ✅ {save_path}")
-            except Exception as e:
-                print(f"  ❌ {emo} {kw}: {e}")
+            jobs.append((emo, kw, url, os.path.join(emo_dir, f"{emo}_{i+1}.jpg")))
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        list(ex.map(_fetch_one, jobs))
 
 if __name__ == "__main__":
     download_emotion_backgrounds()
@@ -2,12 +2,64 @@
 # DuckDuckGo(ddgs) 최신버전 호환 + rate limit 방지
 
 from ddgs import DDGS
-import requests, os, time, random
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import requests, os, shutil, time, threading
 
 # 📁 폴더 생성
 os.makedirs("dataset/cats", exist_ok=True)
 os.makedirs("dataset/not_cats", exist_ok=True)
 
+# ✅ 병렬 다운로드 + 세션 keep-alive 재사용
+MAX_WORKERS = 8
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# ✅ 서버 과부하 방지: 요청 간 sleep 대신 토큰 버킷으로 전체 요청 속도 제한
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate, self.capacity = rate, capacity
+        self.tokens, self.last = capacity, time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+RATE_LIMIT = TokenBucket(rate=2.0, capacity=4)  # 초당 2건, 최대 4건 버스트
+
+def _fetch_one(job):
+    url, filename = job
+    RATE_LIMIT.acquire()
+    tmp_path = filename + ".part"
+    try:
+        # 응답 전체를 메모리에 올리지 않고 64KB 단위로 디스크에 스트리밍
+        with SESSION.get(url, timeout=10, stream=True) as response:
+            if response.status_code == 200:
+                # 핫링크 차단/HTML 페이지가 .jpg로 저장되면 학습 시 ImageFolder 디코드가 실패함
+                ctype = response.headers.get("Content-Type", "")
+                if not ctype.startswith("image/"):
+                    raise ValueError(f"이미지가 아닌 응답: {ctype or '(없음)'} : {url}")
+                response.raw.decode_content = True
+                with open(tmp_path, "wb") as f:
+                    shutil.copyfileobj(response.raw, f, 65536)
+                os.replace(tmp_path, filename)  # 끝까지 받은 경우에만 최종 파일로
+                print(f"✅ 저장됨: {filename}")
+            else:
+                print(f"⚠️ 상태 코드 {response.status_code} : {url}")
+    except Exception as e:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        print(f"❌ 오류: {e}")
+
 # ✅ 공통 다운로드 함수
 def download_images(query, count, folder):
     print(f"\n🔍 '{query}' 이미지 {count}장 다운로드 시작...")
@@ -16,24 +68,10 @@ def download_images(query, count, folder):
     # ✅ 최신 버전에서는 'query'만 인자로 전달
     results = ddg.images(query, max_results=count)
 
-    for i, r in enumerate(results):
-        try:
-            url = r.get("image")
-            if not url:
-                continue
-
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                filename = f"{folder}/{query.replace(' ', '_')}_{i}.jpg"
-                with open(filename, "wb") as f:
-                    f.write(response.content)
-                print(f"✅ 저장됨: {filename}")
-            else:
-                print(f"⚠️ 상태 코드 {response.status_code} : {url}")
-        except Exception as e:
-            print(f"❌ 오류: {e}")
-        # ✅ 서버 과부하 방지
-        time.sleep(random.uniform(1.0, 2.5))
+    jobs = [(r["image"], f"{folder}/{query.replace(' ', '_')}_{i}.jpg")
+            for i, r in enumerate(results) if r.get("image")]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        list(ex.map(_fetch_one, jobs))
 
 # 🐱 고양이 10장 다운로드
 download_images("cat photo", 10, "dataset/cats")
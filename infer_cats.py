@@ -34,11 +34,13 @@ def predict_image(model, idx_to_class, image_path, img_size=224):
     ])
 
     # 이미지 불러오기
-    img = Image.open(image_path).convert("RGB")
+    img = Image.open(image_path)
+    img.draft("RGB", (int(img_size * 1.15),) * 2)  # JPEG는 필요한 크기 근처로 축소 디코드
+    img = img.convert("RGB")
     img_t = preprocess(img).unsqueeze(0)  # 배치 차원 추가
 
     # 예측
-    with torch.no_grad():
+    with torch.inference_mode():
         logits = model(img_t)
         probs = torch.nn.functional.softmax(logits, dim=1)
         conf, pred_idx = torch.max(probs, dim=1)
@@ -3,6 +3,7 @@
 # train_cats.py 학습 결과를 그래프로 시각화하는 스크립트
 # -----------------------------------------------------
 
+import ast
 import json
 import matplotlib.pyplot as plt
 import os
@@ -19,7 +20,10 @@ def load_logs(path=LOG_PATH):
         for line in f:
             if not line.strip():
                 continue
-            data = eval(line.strip())  # train_cats.py가 dict 문자열로 기록함
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                data = ast.literal_eval(line.strip())  # 예전 로그는 dict 문자열(str(dict))로 기록됨
             epochs.append(data["epoch"])
             train_loss.append(data["train_loss"])
             val_loss.append(data["val_loss"])
@@ -3,23 +3,40 @@
 # Tiny cat vs not-cat classifier with on-the-fly augmentation (PyTorch).
 
 import argparse
+import json
 import os
 import random
 from pathlib import Path
 from typing import Tuple, Dict, List
 
+import numpy as np
 import torch
 import torch.nn as nn
-from torch.utils.data import DataLoader, Subset
+from torch.utils.data import DataLoader, Dataset
 from torchvision import datasets, transforms, models
 
 def set_seed(seed: int = 42):
     random.seed(seed)
+    np.random.seed(seed)
     torch.manual_seed(seed)
     torch.cuda.manual_seed_all(seed)
     torch.backends.cudnn.deterministic = True
     torch.backends.cudnn.benchmark = False
 
+class TransformSubset(Dataset):
+    """하나의 ImageFolder를 공유하면서 인덱스 집합마다 다른 transform을 적용."""
+    def __init__(self, base: datasets.ImageFolder, indices: List[int], transform):
+        self.base = base
+        self.indices = indices
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        img, y = self.base[self.indices[i]]
+        return self.transform(img), y
+
 def build_dataloaders(
     data_dir: str,
     img_size: int = 224,
@@ -46,33 +63,33 @@ def build_dataloaders(
                              std=[0.229, 0.224, 0.225]),
     ])
 
-    full_dataset = datasets.ImageFolder(data_dir, transform=train_transform)
+    # 디렉터리 스캔은 한 번만, transform은 split별로 TransformSubset에서 적용
+    full_dataset = datasets.ImageFolder(data_dir)
     class_to_idx = full_dataset.class_to_idx
 
-    full_dataset_val = datasets.ImageFolder(data_dir, transform=val_transform)
-
-    indices_by_class: Dict[int, List[int]] = {v: [] for v in class_to_idx.values()}
-    for idx, (_, y) in enumerate(full_dataset.samples):
-        indices_by_class[y].append(idx)
+    # 클래스별 인덱스 분리/셔플을 NumPy로 (stratified split)
+    labels = np.fromiter((y for _, y in full_dataset.samples), dtype=np.int64, count=len(full_dataset.samples))
 
     train_indices, val_indices = [], []
-    for cls, idxs in indices_by_class.items():
-        random.shuffle(idxs)
+    for cls in class_to_idx.values():
+        idxs = np.random.permutation(np.flatnonzero(labels == cls))
         cut = max(1, int(len(idxs) * (1 - val_ratio))) if len(idxs) > 1 else len(idxs)
-        train_indices.extend(idxs[:cut])
-        val_indices.extend(idxs[cut:])
+        train_indices.extend(idxs[:cut].tolist())
+        val_indices.extend(idxs[cut:].tolist())
 
     train_indices = train_indices if len(train_indices) > 0 else list(range(len(full_dataset)))
     if len(val_indices) == 0 and len(full_dataset) > 1:
         val_indices = [train_indices.pop()]
 
-    train_ds = Subset(full_dataset, train_indices)
-    val_ds = Subset(full_dataset_val, val_indices)
+    train_ds = TransformSubset(full_dataset, train_indices, train_transform)
+    val_ds = TransformSubset(full_dataset, val_indices, val_transform)
 
+    # 워커를 epoch마다 다시 띄우지 않도록 유지 (num_workers=0이면 해당 옵션 사용 불가)
+    worker_kwargs = dict(persistent_workers=True, prefetch_factor=4) if num_workers > 0 else {}
     train_loader = DataLoader(train_ds, batch_size=batch_size, shuffle=True,
-                              num_workers=num_workers, pin_memory=True)
+                              num_workers=num_workers, pin_memory=True, **worker_kwargs)
     val_loader = DataLoader(val_ds, batch_size=batch_size, shuffle=False,
-                            num_workers=num_workers, pin_memory=True)
+                            num_workers=num_workers, pin_memory=True, **worker_kwargs)
     return train_loader, val_loader, class_to_idx
 
 def build_model(num_classes: int = 2, pretrained: bool = False) -> nn.Module:
@@ -84,6 +101,23 @@ def build_model(num_classes: int = 2, pretrained: bool = False) -> nn.Module:
     model.fc = nn.Linear(in_features, num_classes)
     return model
 
+@torch.no_grad()
+def export_int8(model: nn.Module, loader: DataLoader, out_path: str, calib_batches: int = 16):
+    """FX 정적 양자화로 CPU 서빙용 INT8 TorchScript 모델을 만든다 (val 데이터로 보정)."""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    model = model.to("cpu").eval()
+    example = torch.zeros(1, 3, 224, 224)
+    prepared = prepare_fx(model, get_default_qconfig_mapping(torch.backends.quantized.engine), (example,))
+    for i, (x, _) in enumerate(loader):
+        if i >= calib_batches:
+            break
+        prepared(x)
+    qmodel = torch.jit.trace(convert_fx(prepared), example)
+    torch.jit.save(qmodel, out_path)
+    print(f"[INT8] saved -> {out_path}")
+
 @torch.no_grad()
 def evaluate(model: nn.Module, loader: DataLoader, device: torch.device) -> Tuple[float, float]:
     model.eval()
@@ -92,7 +126,8 @@ def evaluate(model: nn.Module, loader: DataLoader, device: torch.device) -> Tupl
     correct = 0
     total = 0
     for x, y in loader:
-        x, y = x.to(device), y.to(device)
+        x = x.to(device, memory_format=torch.channels_last, non_blocking=True)
+        y = y.to(device, non_blocking=True)
         logits = model(x)
         loss = criterion(logits, y)
         total_loss += loss.item() * x.size(0)
@@ -113,6 +148,8 @@ def train(
     val_ratio: float = 0.2,
     num_workers: int = 2,
     seed: int = 42,
+    int8: bool = False,
+    compile_model: bool = False,
 ):
     set_seed(seed)
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -127,17 +164,23 @@ def train(
     )
     print("[Classes]", class_to_idx)
 
-    model = build_model(num_classes=len(class_to_idx), pretrained=pretrained).to(device)
+    # ResNet conv 커널은 NHWC(channels_last)에서 더 빠름
+    model = build_model(num_classes=len(class_to_idx), pretrained=pretrained).to(device, memory_format=torch.channels_last)
     criterion = nn.CrossEntropyLoss()
+    # torch.compile은 forward 경로에만 사용, 저장은 원본 모듈 기준 (state_dict에 _orig_mod 접두사 방지)
+    net = torch.compile(model, mode="reduce-overhead") if compile_model and hasattr(torch, "compile") else model
     optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    # CUDA에서는 fp16 AMP + GradScaler (CPU는 bf16 지원이 제각각이라 FP32 유지)
+    use_amp = device.type == "cuda"
+    scaler = torch.amp.GradScaler(device.type, enabled=use_amp)
 
     os.makedirs("models", exist_ok=True)
     os.makedirs("logs", exist_ok=True)
 
     best_val_acc = 0.0
     best_path = "models/cats_resnet18.pt"
+    int8_path = "models/cats_resnet18_int8.pt"
 
-    import json
     with open("models/class_to_idx.json", "w", encoding="utf-8") as f:
         json.dump(class_to_idx, f, ensure_ascii=False, indent=2)
 
@@ -148,12 +191,15 @@ def train(
         running_total = 0
 
         for x, y in train_loader:
-            x, y = x.to(device), y.to(device)
-            optimizer.zero_grad()
-            logits = model(x)
-            loss = criterion(logits, y)
-            loss.backward()
-            optimizer.step()
+            x = x.to(device, memory_format=torch.channels_last, non_blocking=True)
+            y = y.to(device, non_blocking=True)
+            optimizer.zero_grad(set_to_none=True)
+            with torch.autocast(device.type, dtype=torch.float16, enabled=use_amp):
+                logits = net(x)
+                loss = criterion(logits, y)
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
 
             running_loss += loss.item() * x.size(0)
             preds = torch.argmax(logits, dim=1)
@@ -163,7 +209,7 @@ def train(
         train_loss = running_loss / max(1, running_total)
         train_acc = running_correct / max(1, running_total)
 
-        val_loss, val_acc = evaluate(model, val_loader, device)
+        val_loss, val_acc = evaluate(net, val_loader, device)
 
         log_line = {
             "epoch": epoch,
@@ -176,14 +222,21 @@ def train(
               f"train_loss={train_loss:.4f} train_acc={train_acc:.4f} | "
               f"val_loss={val_loss:.4f} val_acc={val_acc:.4f}")
         with open("logs/train_log.jsonl", "a", encoding="utf-8") as f:
-            f.write(str(log_line) + "\n")
+            f.write(json.dumps(log_line) + "\n")
 
         if val_acc >= best_val_acc:
             best_val_acc = val_acc
             torch.save(model.state_dict(), best_path)
+            # 서빙 앱은 INT8 파일을 우선 로드하므로, 새 체크포인트와 어긋난 예전 INT8은 지운다
+            if not int8 and os.path.exists(int8_path):
+                os.remove(int8_path)
 
     print(f"[Best] val_acc={best_val_acc:.4f} -> saved to {best_path}")
 
+    if int8:
+        model.load_state_dict(torch.load(best_path, map_location=device))
+        export_int8(model, val_loader, int8_path)
+
 def parse_args():
     p = argparse.ArgumentParser(description="Tiny Cat vs Not-Cat Trainer (with on-the-fly augmentation)")
     p.add_argument("--data_dir", type=str, default="dataset", help="Root directory with class subfolders")
@@ -195,6 +248,8 @@ def parse_args():
     p.add_argument("--val_ratio", type=float, default=0.2)
     p.add_argument("--num_workers", type=int, default=2)
     p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--int8", action="store_true", help="Also export an INT8-quantized TorchScript model for CPU serving")
+    p.add_argument("--compile", action="store_true", help="Speed up training with torch.compile (PyTorch 2.x)")
     return p.parse_args()
 
 if __name__ == "__main__":
@@ -209,4 +264,6 @@ if __name__ == "__main__":
         val_ratio=args.val_ratio,
         num_workers=args.num_workers,
         seed=args.seed,
+        int8=args.int8,
+        compile_model=args.compile,
     )